@@ -1,11 +1,97 @@
 import asyncio
-from typing import Optional, Tuple, Dict, Any
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Optional, Tuple, Dict, Any, List, Union, Callable, Awaitable, NamedTuple
+import aiohttp
+import aiosqlite
+import orjson
+from geopy.adapters import AioHTTPAdapter
 from geopy.geocoders import Nominatim, GoogleV3
-from opencage.geocoder import OpenCageGeocode
+from geopy.geocoders.base import Geocoder
 from loguru import logger
 from config import settings
 from models import LocationInput, LocationData
 
+OPENCAGE_URL = "https://api.opencagedata.com/geocode/v1/json"
+
+# Seconds to remember queries that no provider could resolve
+NEGATIVE_CACHE_TTL = 300
+
+# Maximum number of concurrent lookups in a batch geocode
+BATCH_MAX_CONCURRENT = 10
+
+# Per-provider (max concurrent requests, minimum seconds between requests)
+PROVIDER_LIMITS = {
+    "GoogleV3": (10, 0.02),
+    "OpenCageGeocoder": (5, 0.1),
+    "Nominatim": (1, 1.0),
+}
+
+# (latitude, longitude, address components) returned by a provider
+GeocodeResult = Tuple[float, float, Dict[str, Any]]
+
+class GeocodeProviderError(Exception):
+    """A provider failed to answer (timeout, connection or HTTP error), as opposed to finding no match"""
+
+class GeocodeProvider(NamedTuple):
+    """A configured provider with its pre-bound async geocode handler"""
+    name: str
+    role: str
+    geocode: Callable[[str], Awaitable[Optional[GeocodeResult]]]
+
+class ProviderThrottle:
+    """
+    Caps concurrency and spaces out calls to a single provider
+    """
+
+    def __init__(self, max_concurrent: int, min_delay: float):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.min_delay = min_delay
+        self.last_call = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            async with self._lock:
+                delay = self.min_delay - (time.monotonic() - self.last_call)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.last_call = time.monotonic()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.semaphore.release()
+
+class SharedSessionAdapter(AioHTTPAdapter):
+    """
+    GeoPy aiohttp adapter that sends requests over a session owned by the caller
+    """
+
+    def __init__(self, *, proxies, ssl_context, get_session: Callable[[], aiohttp.ClientSession]):
+        super().__init__(proxies=proxies, ssl_context=ssl_context)
+        self._get_session = get_session
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self._get_session()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # The shared session is closed by its owner, not per geocoder
+        pass
+
+class OpenCageGeocoder:
+    """
+    Minimal OpenCage provider queried directly over the shared aiohttp session
+    """
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
 class GeocodingClient:
     """
     Geocoding client with multiple provider fallback
@@ -18,7 +104,41 @@ class GeocodingClient:
         # Initialize primary geocoder (Google if available, otherwise OpenCage)
         self.primary_geocoder = None
         self.fallback_geocoder = None
-        self.free_geocoder = Nominatim(user_agent="RankTracker-Prototype/1.0")
+        # GeoPy geocoders send requests over the shared session below
+        self._adapter_factory = partial(SharedSessionAdapter, get_session=self._get_session)
+        self.free_geocoder = Nominatim(
+            user_agent="RankTracker-Prototype/1.0",
+            adapter_factory=self._adapter_factory
+        )
+
+        # In-memory LRU cache of normalized query -> (expiry time, geocoding result).
+        # Entries share the persistent cache's TTL, so both tiers refresh together.
+        self._cache: "OrderedDict[str, Tuple[float, GeocodeResult]]" = OrderedDict()
+        self._cache_lock = asyncio.Lock()
+        self._cache_max = 4096
+
+        # Normalized query -> expiry time for queries that failed to geocode
+        self._negative_cache: "OrderedDict[str, float]" = OrderedDict()
+
+        # Persistent SQLite cache shared across restarts and worker processes
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = asyncio.Lock()
+        self._db_disabled = False
+
+        # Shared HTTP session for every provider call, created on first use
+        self._aio_session: Optional[aiohttp.ClientSession] = None
+
+        # Rate limiting per provider to avoid HTTP 429 responses under bursts
+        self._throttles = {
+            name: ProviderThrottle(max_concurrent, min_delay)
+            for name, (max_concurrent, min_delay) in PROVIDER_LIMITS.items()
+        }
+
+        # Normalized query -> lookup currently in flight for it
+        self._inflight: Dict[str, "asyncio.Future[Optional[GeocodeResult]]"] = {}
+
+        # Providers in the order they are tried
+        self._providers: List[GeocodeProvider] = []
 
         self._setup_geocoders()
 
@@ -28,7 +148,8 @@ class GeocodingClient:
             try:
                 self.primary_geocoder = GoogleV3(
                     api_key=self.google_api_key,
-                    user_agent="RankTracker-Prototype/1.0"
+                    user_agent="RankTracker-Prototype/1.0",
+                    adapter_factory=self._adapter_factory
                 )
                 logger.info("Google Maps geocoder initialized as primary")
             except Exception as e:
@@ -36,7 +157,7 @@ class GeocodingClient:
 
         if self.opencage_api_key:
             try:
-                fallback_or_primary = OpenCageGeocode(self.opencage_api_key)
+                fallback_or_primary = OpenCageGeocoder(self.opencage_api_key)
                 if self.primary_geocoder is None:
                     self.primary_geocoder = fallback_or_primary
                     logger.info("OpenCage geocoder initialized as primary")
@@ -50,97 +171,393 @@ class GeocodingClient:
             self.primary_geocoder = self.free_geocoder
             logger.info("Using free Nominatim geocoder as primary")
 
+        self._register_provider(self.primary_geocoder, "primary")
+        if self.fallback_geocoder:
+            self._register_provider(self.fallback_geocoder, "fallback")
+        # Use free geocoder as last resort if it's not already the primary
+        if self.primary_geocoder != self.free_geocoder:
+            self._register_provider(self.free_geocoder, "free")
+
+    def _register_provider(self, geocoder, role: str):
+        """Bind the geocode handler for a provider once so lookups skip type dispatch"""
+        name = type(geocoder).__name__
+        if isinstance(geocoder, OpenCageGeocoder):
+            handler = partial(self._geocode_opencage, geocoder)
+        else:
+            handler = partial(self._geocode_geopy, geocoder, self._throttles[name])
+        self._providers.append(GeocodeProvider(name, role, handler))
+
     async def geocode_location(self, location_input: LocationInput) -> LocationData:
         """
         Geocode location input to coordinates with fallback providers
         """
-        # Build query string
-        query_parts = [location_input.address]
-        if location_input.pincode:
-            query_parts.append(location_input.pincode)
-        if location_input.city:
-            query_parts.append(location_input.city)
-        if location_input.country:
-            query_parts.append(location_input.country)
+        return await self._geocode(location_input, self._geocode_with_providers)
 
-        query = ", ".join(query_parts)
+    async def geocode_location_hedged(self, location_input: LocationInput, hedge_delay: float = 0.3) -> LocationData:
+        """
+        Geocode for latency-sensitive callers by hedging the primary provider
 
-        logger.info(f"Geocoding location: {query}")
+        If the primary has not answered within hedge_delay seconds the fallback
+        is raced against it and the first successful answer wins. This trades
+        extra provider calls for lower tail latency.
+        """
+        return await self._geocode(location_input, partial(self._geocode_hedged, hedge_delay=hedge_delay))
 
-        # Try primary geocoder
-        result = await self._geocode_with_provider(query, self.primary_geocoder, "primary")
-        if result:
-            return self._create_location_data(location_input, result, query)
+    async def _geocode(self, location_input: LocationInput, resolver: Callable[[str], Awaitable[Optional[GeocodeResult]]]) -> LocationData:
+        """
+        Geocode through the caches, resolving misses with the given provider strategy
+        """
+        # Build query string from the non-empty location fields
+        parts = (location_input.address, location_input.pincode, location_input.city, location_input.country)
+        query = ", ".join(part for part in parts if part)
+        key = " ".join(query.lower().split())
+
+        # Serve repeat lookups from the cache
+        now = time.monotonic()
+        cached = None
+        async with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                expires_at, cached = entry
+                if now < expires_at:
+                    self._cache.move_to_end(key)
+                else:
+                    del self._cache[key]
+                    cached = None
+            negative_expiry = self._negative_cache.get(key)
+        if cached is not None:
+            return self._create_location_data(location_input, cached, query)
+
+        # Fail fast on queries that recently failed with every provider
+        if negative_expiry is not None and now < negative_expiry:
+            raise ValueError(f"Could not geocode location: {query}")
+
+        # Coalesce concurrent lookups of the same query into a single resolution
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve_query(key, query, resolver))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        result = await asyncio.shield(task)
+        if result is None:
+            # If all fail, raise exception
+            raise ValueError(f"Could not geocode location: {query}")
+
+        return self._create_location_data(location_input, result, query)
+
+    async def _resolve_query(self, key: str, query: str, resolver: Callable[[str], Awaitable[Optional[GeocodeResult]]]) -> Optional[GeocodeResult]:
+        """
+        Resolve a query missing from the memory cache via the persistent cache or providers
+        """
+        persisted = await self._db_lookup(key)
+        if persisted is not None:
+            cached, ttl_remaining = persisted
+            logger.debug("Geocode persistent cache hit: {}", query)
+            # Expire from memory when the persisted row does, not a full TTL later
+            await self._cache_store(key, cached, ttl_remaining)
+            return cached
 
-        # Try fallback geocoder
-        if self.fallback_geocoder:
-            result = await self._geocode_with_provider(query, self.fallback_geocoder, "fallback")
+        logger.debug("Geocoding location: {}", query)
+
+        try:
+            result = await resolver(query)
+        except GeocodeProviderError as e:
+            # Provider outages are transient, so never negative-cache them
+            logger.warning(f"Geocoding unavailable for {query}: {e}")
+            return None
+
+        if result is None:
+            # Every provider answered with no match, so retries fail fast
+            await self._cache_store_negative(key)
+            return None
+
+        await self._cache_store(key, result)
+        await self._db_store(key, result)
+        return result
+
+    async def geocode_locations(self, location_inputs: List[LocationInput]) -> List[Union[LocationData, Exception]]:
+        """
+        Geocode many locations concurrently, preserving input order
+
+        Failed lookups are returned in place as the raised exception.
+        """
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENT)
+
+        async def _geocode_one(location_input: LocationInput) -> LocationData:
+            async with semaphore:
+                return await self.geocode_location(location_input)
+
+        return await asyncio.gather(
+            *[_geocode_one(location_input) for location_input in location_inputs],
+            return_exceptions=True
+        )
+
+    async def _geocode_with_providers(self, query: str) -> Optional[Tuple[float, float, Dict[str, Any]]]:
+        """
+        Try each configured provider in order until one succeeds
+
+        Returns None when every provider found no match, and raises
+        GeocodeProviderError when none matched and at least one failed.
+        """
+        failed = 0
+        for provider in self._providers:
+            try:
+                result = await self._geocode_with_provider(query, provider)
+            except GeocodeProviderError:
+                failed += 1
+                continue
             if result:
-                return self._create_location_data(location_input, result, query)
+                return result
 
-        # Try free geocoder as last resort
-        if self.primary_geocoder != self.free_geocoder:
-            result = await self._geocode_with_provider(query, self.free_geocoder, "free")
+        if failed:
+            raise GeocodeProviderError(f"{failed} of {len(self._providers)} providers failed")
+        return None
+
+    async def _geocode_hedged(self, query: str, hedge_delay: float) -> Optional[GeocodeResult]:
+        """
+        Race the primary and fallback providers, then try any remaining ones in order
+        """
+        if len(self._providers) < 2:
+            return await self._geocode_with_providers(query)
+
+        primary, fallback = self._providers[0], self._providers[1]
+        pending = {asyncio.ensure_future(self._geocode_with_provider(query, primary))}
+        started = 1
+        failed = 0
+
+        done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+        if not done:
+            # Primary is slow, hedge with the fallback
+            pending.add(asyncio.ensure_future(self._geocode_with_provider(query, fallback)))
+            started = 2
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        result = task.result()
+                    except GeocodeProviderError:
+                        failed += 1
+                        continue
+                    if result:
+                        return result
+        finally:
+            # Cancel the slower provider
+            for task in pending:
+                task.cancel()
+
+        for provider in self._providers[started:]:
+            try:
+                result = await self._geocode_with_provider(query, provider)
+            except GeocodeProviderError:
+                failed += 1
+                continue
             if result:
-                return self._create_location_data(location_input, result, query)
+                return result
 
-        # If all fail, raise exception
-        raise ValueError(f"Could not geocode location: {query}")
+        if failed:
+            raise GeocodeProviderError(f"{failed} of {len(self._providers)} providers failed")
+        return None
 
-    async def _geocode_with_provider(self, query: str, geocoder, provider_name: str) -> Optional[Tuple[float, float, Dict[str, Any]]]:
+    async def _cache_store(self, key: str, result: Tuple[float, float, Dict[str, Any]], ttl: Optional[float] = None):
         """
-        Try to geocode with a specific provider
+        Store a geocoding result for ttl seconds (default geocode_cache_ttl), evicting the least recently used entry when full
+        """
+        if ttl is None:
+            ttl = settings.geocode_cache_ttl
+        async with self._cache_lock:
+            self._cache[key] = (time.monotonic() + ttl, result)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+            self._negative_cache.pop(key, None)
+
+    async def _cache_store_negative(self, key: str):
+        """
+        Remember a query that no provider could resolve for NEGATIVE_CACHE_TTL seconds
+        """
+        async with self._cache_lock:
+            self._negative_cache[key] = time.monotonic() + NEGATIVE_CACHE_TTL
+            self._negative_cache.move_to_end(key)
+            if len(self._negative_cache) > self._cache_max:
+                self._negative_cache.popitem(last=False)
+
+    async def _get_db(self) -> Optional[aiosqlite.Connection]:
+        """
+        Lazily open the persistent cache database
         """
+        if self._db is not None or self._db_disabled:
+            return self._db
+
+        async with self._db_lock:
+            if self._db is None and not self._db_disabled:
+                try:
+                    db = await aiosqlite.connect(settings.geocode_cache_path)
+                    await db.execute(
+                        "CREATE TABLE IF NOT EXISTS cache ("
+                        "query_key TEXT PRIMARY KEY, lat REAL, lng REAL, components TEXT, ts INTEGER)"
+                    )
+                    await db.commit()
+                    self._db = db
+                except Exception as e:
+                    logger.warning(f"Persistent geocode cache unavailable: {e}")
+                    self._db_disabled = True
+
+        return self._db
+
+    async def _db_lookup(self, key: str) -> Optional[Tuple[GeocodeResult, float]]:
+        """
+        Look up a non-expired geocoding result in the persistent cache
+
+        Returns the result with the seconds left before it expires.
+        """
+        db = await self._get_db()
+        if db is None:
+            return None
+
         try:
-            if isinstance(geocoder, OpenCageGeocode):
-                # OpenCage is synchronous but we run it in executor
-                loop = asyncio.get_event_loop()
-                results = await loop.run_in_executor(None, geocoder.geocode, query)
-
-                if results and len(results) > 0:
-                    location = results[0]
-                    lat = location['geometry']['lat']
-                    lng = location['geometry']['lng']
-                    components = location.get('components', {})
-
-                    logger.info(f"Successfully geocoded with {provider_name}: {lat}, {lng}")
-                    return lat, lng, components
-
-            else:
-                # GeoPy geocoders
-                loop = asyncio.get_event_loop()
-                location = await loop.run_in_executor(None, geocoder.geocode, query)
-
-                if location:
-                    lat = location.latitude
-                    lng = location.longitude
-
-                    # Extract components from raw data
-                    components = {}
-                    if hasattr(location, 'raw'):
-                        raw = location.raw
-                        if 'address_components' in raw:
-                            for component in raw['address_components']:
-                                types = component.get('types', [])
-                                if 'locality' in types:
-                                    components['city'] = component['long_name']
-                                elif 'country' in types:
-                                    components['country'] = component['long_name']
-                        elif 'display_name' in raw:
-                            # Nominatim format
-                            parts = raw['display_name'].split(', ')
-                            if len(parts) >= 2:
-                                components['city'] = parts[-3] if len(parts) > 2 else parts[0]
-                                components['country'] = parts[-1]
-
-                    logger.info(f"Successfully geocoded with {provider_name}: {lat}, {lng}")
-                    return lat, lng, components
+            async with db.execute(
+                "SELECT lat, lng, components, ts FROM cache WHERE query_key = ?", (key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"Persistent geocode cache lookup failed: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        lat, lng, components, ts = row
+        ttl_remaining = settings.geocode_cache_ttl - (time.time() - ts)
+        if ttl_remaining <= 0:
+            return None
+
+        return (lat, lng, orjson.loads(components)), ttl_remaining
 
+    async def _db_store(self, key: str, result: Tuple[float, float, Dict[str, Any]]):
+        """
+        Persist a geocoding result
+        """
+        db = await self._get_db()
+        if db is None:
+            return
+
+        lat, lng, components = result
+        try:
+            await db.execute(
+                "INSERT OR REPLACE INTO cache (query_key, lat, lng, components, ts) VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lng, orjson.dumps(components).decode(), int(time.time()))
+            )
+            await db.commit()
         except Exception as e:
-            logger.warning(f"Geocoding failed with {provider_name}: {e}")
+            logger.warning(f"Persistent geocode cache write failed: {e}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared aiohttp session, creating it inside the running loop
+        """
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=32,
+                    limit_per_host=16,
+                    ttl_dns_cache=300,
+                    use_dns_cache=True,
+                    keepalive_timeout=75
+                ),
+                timeout=aiohttp.ClientTimeout(total=settings.request_timeout),
+                headers={'User-Agent': 'RankTracker-Prototype/1.0'}
+            )
+        return self._aio_session
+
+    async def close(self):
+        """
+        Release resources held by the client
+        """
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+
+    async def _geocode_with_provider(self, query: str, provider: GeocodeProvider) -> Optional[GeocodeResult]:
+        """
+        Try to geocode with a specific provider
+
+        Returns None when the provider found no match and raises
+        GeocodeProviderError when the provider itself failed.
+        """
+        try:
+            result = await provider.geocode(query)
+        except Exception as e:
+            logger.warning(f"Geocoding failed with {provider.role}: {e}")
+            raise GeocodeProviderError(f"{provider.name}: {e}") from e
+
+        if result:
+            lat, lng, _ = result
+            logger.debug("Successfully geocoded with {}: {}, {}", provider.role, lat, lng)
+            return result
 
         return None
 
+    async def _geocode_opencage(self, geocoder: OpenCageGeocoder, query: str) -> Optional[GeocodeResult]:
+        """
+        Geocode with OpenCage, a plain JSON REST endpoint called directly
+        """
+        params = {"q": query, "key": geocoder.api_key}
+        async with self._throttles["OpenCageGeocoder"]:
+            async with self._get_session().get(OPENCAGE_URL, params=params) as response:
+                if response.status != 200:
+                    raise GeocodeProviderError(f"OpenCage API error: {response.status}")
+                data = orjson.loads(await response.read())
+
+        results = data.get('results', [])
+        if not results:
+            return None
+
+        location = results[0]
+        return location['geometry']['lat'], location['geometry']['lng'], location.get('components', {})
+
+    async def _geocode_geopy(self, geocoder: Geocoder, throttle: ProviderThrottle, query: str) -> Optional[GeocodeResult]:
+        """
+        Geocode with a GeoPy geocoder, run natively on the event loop over the shared session
+        """
+        async with throttle:
+            location = await geocoder.geocode(query)
+
+        if not location:
+            return None
+
+        # Extract components from raw data
+        components = {}
+        if hasattr(location, 'raw'):
+            raw = location.raw
+            if 'address_components' in raw:
+                # Single pass lookup table of component type -> name
+                type_map = {
+                    component_type: component['long_name']
+                    for component in raw['address_components']
+                    for component_type in component.get('types', ())
+                }
+                city = type_map.get('locality')
+                country = type_map.get('country')
+                if city:
+                    components['city'] = city
+                if country:
+                    components['country'] = country
+            elif 'display_name' in raw:
+                # Nominatim format
+                parts = raw['display_name'].split(', ')
+                if len(parts) >= 2:
+                    components['city'] = parts[-3] if len(parts) > 2 else parts[0]
+                    components['country'] = parts[-1]
+
+        return location.latitude, location.longitude, components
+
     def _create_location_data(self, location_input: LocationInput, result: Tuple[float, float, Dict[str, Any]], original_query: str) -> LocationData:
         """
         Create LocationData from geocoding result
@@ -165,33 +582,17 @@ class GeocodingClient:
             "providers": []
         }
 
-        # Test primary geocoder
-        if self.primary_geocoder:
-            provider_name = type(self.primary_geocoder).__name__
-            test_result = await self._test_geocoder(self.primary_geocoder, provider_name)
-            status["providers"].append({
-                "name": provider_name,
-                "type": "primary",
-                "status": "working" if test_result else "error"
-            })
-
-        # Test fallback geocoder
-        if self.fallback_geocoder:
-            provider_name = type(self.fallback_geocoder).__name__
-            test_result = await self._test_geocoder(self.fallback_geocoder, provider_name)
-            status["providers"].append({
-                "name": provider_name,
-                "type": "fallback",
-                "status": "working" if test_result else "error"
-            })
+        # Probe all providers concurrently
+        results = await asyncio.gather(
+            *[self._test_geocoder(provider) for provider in self._providers],
+            return_exceptions=True
+        )
 
-        # Test free geocoder if it's not already the primary
-        if self.primary_geocoder != self.free_geocoder:
-            test_result = await self._test_geocoder(self.free_geocoder, "Nominatim")
+        for provider, test_result in zip(self._providers, results):
             status["providers"].append({
-                "name": "Nominatim",
-                "type": "free",
-                "status": "working" if test_result else "error"
+                "name": provider.name,
+                "type": provider.role,
+                "status": "working" if test_result is True else "error"
             })
 
         # Determine overall status
@@ -200,12 +601,12 @@ class GeocodingClient:
 
         return status
 
-    async def _test_geocoder(self, geocoder, provider_name: str) -> bool:
+    async def _test_geocoder(self, provider: GeocodeProvider) -> bool:
         """
         Test if a geocoder is working
         """
         try:
-            result = await self._geocode_with_provider("New York, NY", geocoder, provider_name)
+            result = await self._geocode_with_provider("New York, NY", provider)
             return result is not None
         except:
             return False
\ No newline at end of file
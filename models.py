@@ -1,7 +1,39 @@
+import sys
 from typing import Optional, List, Dict, Any, Literal
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 from datetime import datetime
 
+# Result depths offered by the UI and billed as tiers by DataForSEO
+ALLOWED_DEPTHS = (20, 40, 60, 100)
+Depth = Literal[20, 40, 60, 100]
+
+# Most keywords accepted by one bulk request; each costs two paid DataForSEO calls
+MAX_BULK_KEYWORDS = 50
+
+# Bounds accepted for a requested depth before it is snapped to an allowed value
+MIN_DEPTH = 1
+MAX_DEPTH = 100
+
+def _snap_depth(v: Any) -> Any:
+    """Snap an integer-like depth within bounds to the nearest allowed depth"""
+    if v is None:
+        return 40
+    if isinstance(v, bool):
+        return v
+    # Accept the same loose input the plain int field did, e.g. "60" or 60.0
+    if isinstance(v, str):
+        try:
+            v = int(v.strip())
+        except ValueError:
+            return v
+    elif isinstance(v, float) and v.is_integer():
+        v = int(v)
+    if isinstance(v, int):
+        if not MIN_DEPTH <= v <= MAX_DEPTH:
+            raise ValueError(f"depth must be between {MIN_DEPTH} and {MAX_DEPTH}")
+        return min(ALLOWED_DEPTHS, key=lambda allowed: abs(allowed - v))
+    return v
+
 class LocationInput(BaseModel):
     """Input model for location data"""
     address: str = Field(..., description="Full address or location name")
@@ -9,8 +41,16 @@ class LocationInput(BaseModel):
     city: Optional[str] = Field(None, description="City name")
     country: Optional[str] = Field(None, description="Country name")
 
+    @field_validator('country')
+    @classmethod
+    def intern_country(cls, v: Optional[str]) -> Optional[str]:
+        # Country names repeat across requests, share one string object
+        return sys.intern(v) if v else v
+
 class LocationData(BaseModel):
     """Processed location data with coordinates"""
+    model_config = ConfigDict(frozen=True)
+
     address: str
     pincode: Optional[str] = None
     latitude: float
@@ -20,20 +60,31 @@ class LocationData(BaseModel):
 
 class RankingRequest(BaseModel):
     """Request model for ranking check"""
+    model_config = ConfigDict(str_strip_whitespace=True, extra="ignore")
+
     keyword: str = Field(..., description="Keyword to track rankings for")
     location: LocationInput = Field(..., description="Location information")
     language_code: Optional[str] = Field("en", description="Language code (e.g., 'en', 'es')")
     device: Optional[Literal["desktop", "mobile"]] = Field("desktop", description="Device type")
-    depth: Optional[int] = Field(40, description="Number of results to fetch", ge=1, le=100)
+    depth: Depth = Field(40, description="Number of results to fetch (20, 40, 60 or 100)")
 
-    @validator('keyword')
-    def keyword_must_not_be_empty(cls, v):
-        if not v or not v.strip():
+    @field_validator('depth', mode='before')
+    @classmethod
+    def depth_to_allowed_value(cls, v: Any) -> Any:
+        return _snap_depth(v)
+
+    @field_validator('keyword')
+    @classmethod
+    def keyword_must_not_be_empty(cls, v: str) -> str:
+        # Whitespace is already stripped by str_strip_whitespace
+        if not v:
             raise ValueError('Keyword cannot be empty')
-        return v.strip()
+        return v
 
 class OrganicResult(BaseModel):
     """Organic search result model"""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     position: Optional[int] = None
     title: Optional[str] = None
     description: Optional[str] = None
@@ -43,6 +94,8 @@ class OrganicResult(BaseModel):
 
 class MapResult(BaseModel):
     """Map search result model"""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     position: Optional[int] = None
     title: Optional[str] = None
     address: Optional[str] = None
@@ -52,6 +105,10 @@ class MapResult(BaseModel):
     reviews_count: Optional[int] = None
     category: Optional[str] = None
 
+# Batch validators for result lists parsed from DataForSEO responses
+OrganicResultsAdapter = TypeAdapter(List[OrganicResult])
+MapResultsAdapter = TypeAdapter(List[MapResult])
+
 class RankingResults(BaseModel):
     """Response model for ranking results"""
     keyword: str
@@ -66,11 +123,28 @@ class RankingResults(BaseModel):
 
 class BulkRankingRequest(BaseModel):
     """Request model for bulk ranking checks"""
-    keywords: List[str] = Field(..., description="List of keywords to track")
+    model_config = ConfigDict(str_strip_whitespace=True, extra="ignore")
+
+    keywords: List[str] = Field(
+        ..., min_length=1, max_length=MAX_BULK_KEYWORDS, description="List of keywords to track"
+    )
     location: LocationInput = Field(..., description="Location information")
     language_code: Optional[str] = Field("en", description="Language code")
     device: Optional[Literal["desktop", "mobile"]] = Field("desktop", description="Device type")
-    depth: Optional[int] = Field(40, description="Number of results to fetch")
+    depth: Depth = Field(40, description="Number of results to fetch (20, 40, 60 or 100)")
+
+    @field_validator('depth', mode='before')
+    @classmethod
+    def depth_to_allowed_value(cls, v: Any) -> Any:
+        return _snap_depth(v)
+
+    @field_validator('keywords')
+    @classmethod
+    def keywords_must_not_be_empty(cls, v: List[str]) -> List[str]:
+        # Whitespace is already stripped by str_strip_whitespace
+        if not all(v):
+            raise ValueError('Keywords cannot be empty')
+        return v
 
 class RankingSummary(BaseModel):
     """Summary statistics for ranking results"""
@@ -4,9 +4,11 @@ Services module for Rank Tracker Prototype
 This module contains service classes for external API integrations:
 - DataForSEOClient: Handles ranking data from DataForSEO API
 - GeocodingClient: Handles location geocoding with multiple providers
+- TTLCache: In-process LRU cache with expiring entries
 """
 
 from .dataforseo_client import DataForSEOClient
 from .geocoding_client import GeocodingClient
+from .cache import TTLCache
 
-__all__ = ['DataForSEOClient', 'GeocodingClient']
\ No newline at end of file
+__all__ = ['DataForSEOClient', 'GeocodingClient', 'TTLCache']
\ No newline at end of file
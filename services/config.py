@@ -14,6 +14,18 @@ class Settings(BaseSettings):
     google_maps_api_key: Optional[str] = Field(None, env="GOOGLE_MAPS_API_KEY")
     opencage_api_key: Optional[str] = Field(None, env="OPENCAGE_API_KEY")
 
+    # Geocode Cache Settings
+    geocode_cache_path: str = Field("geocode_cache.sqlite", env="GEOCODE_CACHE_PATH")
+    geocode_cache_ttl: int = Field(30 * 24 * 3600, env="GEOCODE_CACHE_TTL")
+
+    # Ranking Response Cache Settings
+    ranking_cache_ttl: int = Field(600, env="RANKING_CACHE_TTL")
+    ranking_cache_size: int = Field(1024, env="RANKING_CACHE_SIZE")
+
+    # DataForSEO Result Cache Settings (seconds)
+    organic_cache_ttl: int = Field(900, env="ORGANIC_CACHE_TTL")
+    maps_cache_ttl: int = Field(900, env="MAPS_CACHE_TTL")
+
     # Application Settings
     environment: str = Field("development", env="ENVIRONMENT")
     debug: bool = Field(True, env="DEBUG")
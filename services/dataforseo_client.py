@@ -1,76 +1,248 @@
 import asyncio
-import aiohttp
+import time
+import httpx
 import base64
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+import orjson
+from datetime import datetime
+from typing import List, Dict, Any, Tuple, Callable, Awaitable, NamedTuple
 from loguru import logger
+from tenacity import (
+    AsyncRetrying, RetryCallState, retry_if_exception_type, retry_if_result,
+    stop_after_attempt, wait_exponential_jitter
+)
 from config import settings
-from models import RankingRequest, LocationData, OrganicResult, MapResult
+from .cache import TTLCache
+from models import (
+    RankingRequest, LocationData, OrganicResult, MapResult,
+    OrganicResultsAdapter, MapResultsAdapter
+)
+
+# Skip re-warming while the pooled connection is still within its keep-alive window
+WARM_UP_INTERVAL = 60
+
+# Report the API as connected without a round trip after a recent success
+HEALTH_CHECK_TTL = 60
+
+# Transient upstream failures retried inside the client (settings.retry_attempts
+# attempts), with jittered exponential backoff
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_MAX_WAIT = 8.0
+_retry_backoff = wait_exponential_jitter(initial=0.5, max=RETRY_MAX_WAIT)
+
+# Language code -> DataForSEO language name, keyed by lower and upper case codes
+LANGUAGE_NAMES = {
+    'en': 'English',
+    'es': 'Spanish',
+    'fr': 'French',
+    'de': 'German',
+    'it': 'Italian',
+    'pt': 'Portuguese',
+    'ru': 'Russian',
+    'ja': 'Japanese',
+    'ko': 'Korean',
+    'zh': 'Chinese'
+}
+LANGUAGE_NAMES.update({code.upper(): name for code, name in list(LANGUAGE_NAMES.items())})
+
+class DataForSEOError(Exception):
+    """A ranking fetch failed (HTTP error, missing or failed task), as opposed to an empty SERP"""
+
+class Rankings(NamedTuple):
+    """Organic and maps results for one ranking check"""
+    organic_results: List[OrganicResult]
+    maps_results: List[MapResult]
+    # When the older of the two result lists was fetched from DataForSEO
+    checked_at: datetime
+    # False when a fetch failed and contributed no results, so the check should not be cached
+    complete: bool
+
+async def _results_or_empty(
+    fetch: Awaitable[Tuple[List[Any], datetime]], label: str
+) -> Tuple[List[Any], datetime, bool]:
+    """Await one ranking fetch, returning (results, fetched_at, True), or ([], now, False) after logging a failure"""
+    try:
+        results, fetched_at = await fetch
+        return results, fetched_at, True
+    except Exception as e:
+        logger.error(f"{label} rankings error: {e}")
+        return [], datetime.utcnow(), False
+
+def _project_organic(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Project an organic SERP item onto OrganicResult fields"""
+    get = item.get
+    return {
+        'position': get('rank_group', get('rank_absolute')),
+        'title': get('title'),
+        'description': get('description'),
+        'url': get('url'),
+        'domain': get('domain'),
+        'breadcrumb': get('breadcrumb')
+    }
+
+def _project_map(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a maps SERP item onto MapResult fields"""
+    get = item.get
+    rating = get('rating')
+    return {
+        'position': get('rank_group', get('rank_absolute')),
+        'title': get('title'),
+        'address': get('address'),
+        'phone': get('phone'),
+        'website': get('url'),
+        'rating': rating.get('rating_value') if rating else None,
+        'reviews_count': rating.get('votes_count') if rating else None,
+        'category': get('category')
+    }
+
+# SERP item type -> projection onto OrganicResult / MapResult fields; other types are skipped
+ORGANIC_HANDLERS = {'organic': _project_organic}
+MAPS_HANDLERS = {'maps_paid': _project_map, 'local_pack': _project_map}
+
+def _project_items(
+    items: List[Dict[str, Any]], handlers: Dict[str, Callable], limit: int
+) -> List[Dict[str, Any]]:
+    """Project up to limit SERP items that have a handler for their type, in order"""
+    projected = []
+    if limit <= 0:
+        return projected
+
+    # Bind hot lookups once; this loop runs for every item of every SERP response
+    append = projected.append
+    handler_for = handlers.get
+    remaining = limit
+    for item in items:
+        handler = handler_for(item.get('type'))
+        if handler is not None:
+            append(handler(item))
+            remaining -= 1
+            if not remaining:
+                break
+    return projected
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Wait for the server's Retry-After (in seconds) when given, otherwise back off"""
+    outcome = retry_state.outcome
+    if outcome is not None and not outcome.failed:
+        retry_after = outcome.result().headers.get('Retry-After')
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), RETRY_MAX_WAIT)
+            except ValueError:
+                pass
+    return _retry_backoff(retry_state)
+
+def create_dataforseo_session() -> httpx.AsyncClient:
+    """
+    Create the application-wide HTTP/2 client for DataForSEO
+
+    Create on app startup and close with aclose() on shutdown.
+    """
+    # Credentials are static, so encode the Basic auth header once
+    credentials = f"{settings.dataforseo_login}:{settings.dataforseo_password}".encode()
+    auth_header = 'Basic ' + base64.b64encode(credentials).decode()
+
+    # HTTP/2 multiplexes concurrent organic and maps calls over one pooled connection
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(settings.request_timeout),
+        limits=httpx.Limits(
+            max_keepalive_connections=20,
+            max_connections=100,
+            keepalive_expiry=75
+        ),
+        headers={
+            'Authorization': auth_header,
+            'Content-Type': 'application/json',
+            # SERP JSON compresses well, httpx decompresses transparently
+            'Accept-Encoding': 'gzip, deflate, br',
+            'User-Agent': 'RankTracker-Prototype/1.0'
+        }
+    )
 
 class DataForSEOClient:
     """
     DataForSEO API client for organic and maps ranking data
     """
 
-    def __init__(self):
+    def __init__(self, session: httpx.AsyncClient):
         self.base_url = settings.dataforseo_url
-        self.login = settings.dataforseo_login
-        self.password = settings.dataforseo_password
-        self.session: Optional[aiohttp.ClientSession] = None
-
-    async def __aenter__(self):
-        """Async context manager entry"""
-        await self.create_session()
-        return self
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        await self.close_session()
-
-    async def create_session(self):
-        """Create aiohttp session with authentication"""
-        auth = aiohttp.BasicAuth(self.login, self.password)
-        timeout = aiohttp.ClientTimeout(total=settings.request_timeout)
-
-        self.session = aiohttp.ClientSession(
-            auth=auth,
-            timeout=timeout,
-            headers={
-                'Content-Type': 'application/json',
-                'User-Agent': 'RankTracker-Prototype/1.0'
-            }
-        )
+        self.session = session
+        self._last_warm_up = 0.0
+        self._warm_up_task = None  # In-flight background warm_up(), if any
+        self._last_ok_ts = float('-inf')
 
-    async def close_session(self):
-        """Close aiohttp session"""
-        if self.session:
-            await self.session.close()
+        # SERP results are stable for minutes, cache them per query as (results, fetched_at)
+        self._organic_cache = TTLCache(ttl=settings.organic_cache_ttl)
+        self._maps_cache = TTLCache(ttl=settings.maps_cache_ttl)
 
-    async def test_connection(self) -> bool:
-        """Test API connection"""
+    async def warm_up(self):
+        """Open a pooled connection ahead of ranking calls using the free user data endpoint"""
+        if time.monotonic() - self._last_warm_up < WARM_UP_INTERVAL:
+            return
+
+        self._last_warm_up = time.monotonic()
         try:
-            url = f"{self.base_url}/serp/google/organic/live/advanced"
+            await self.session.get(f"{self.base_url}/appendix/user_data")
+        except Exception as e:
+            logger.warning(f"DataForSEO warm up failed: {e}")
 
-            # Simple test request
-            test_task = [{
-                "keyword": "test",
-                "location_name": "United States",
-                "language_name": "English",
-                "device": "desktop",
-                "depth": 1
-            }]
-
-            async with self.session.post(url, json=test_task) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get('status_code') == 20000
+    def start_warm_up(self):
+        """Warm up in the background so callers never wait on the extra round trip"""
+        if self._warm_up_task is None or self._warm_up_task.done():
+            self._warm_up_task = asyncio.ensure_future(self.warm_up())
+
+    async def test_connection(self) -> bool:
+        """Test API connection using the free user data endpoint, memoizing recent successes"""
+        if time.monotonic() - self._last_ok_ts < HEALTH_CHECK_TTL:
+            return True
+
+        try:
+            response = await self.session.get(f"{self.base_url}/appendix/user_data")
+            if response.status_code != 200:
+                return False
+            data = orjson.loads(response.content)
+            if data.get('status_code') != 20000:
                 return False
 
+            self._last_ok_ts = time.monotonic()
+            return True
+
         except Exception as e:
             logger.error(f"DataForSEO connection test failed: {e}")
             return False
 
-    async def get_organic_rankings(self, request: RankingRequest, location: LocationData) -> List[OrganicResult]:
-        """Get organic search rankings"""
+    async def _post_task(self, url: str, task: Dict[str, Any]) -> httpx.Response:
+        """
+        POST a single live task, retrying transport errors and retryable statuses
+
+        Returns the last response once attempts run out, so callers report its status.
+        """
+        body = orjson.dumps([task])
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(settings.retry_attempts),
+            wait=_retry_wait,
+            retry=(
+                retry_if_exception_type(httpx.TransportError)
+                | retry_if_result(lambda response: response.status_code in RETRY_STATUSES)
+            ),
+            retry_error_callback=lambda retry_state: retry_state.outcome.result()
+        )
+        return await retrying(self.session.post, url, content=body)
+
+    async def get_organic_rankings(
+        self, request: RankingRequest, location: LocationData
+    ) -> Tuple[List[OrganicResult], datetime]:
+        """
+        Get organic search rankings and when they were fetched from DataForSEO
+
+        Raises DataForSEOError when the fetch fails.
+        """
+        cache_key = self._cache_key(request, location)
+        cached = self._organic_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             url = f"{self.base_url}/serp/google/organic/live/advanced"
 
@@ -85,55 +257,62 @@ class DataForSEOClient:
                 "include_serp_info": True
             }
 
-            logger.info(f"Requesting organic rankings for: {request.keyword}")
+            logger.info("Requesting organic rankings for: {}", request.keyword)
+
+            response = await self._post_task(url, task)
+            if response.status_code != 200:
+                raise DataForSEOError(f"DataForSEO API error: {response.status_code}")
 
-            async with self.session.post(url, json=[task]) as response:
-                if response.status != 200:
-                    logger.error(f"DataForSEO API error: {response.status}")
-                    return []
+            data = orjson.loads(response.content)
 
-                data = await response.json()
+            if not data.get('tasks') or len(data['tasks']) == 0:
+                raise DataForSEOError("No tasks returned from DataForSEO")
 
-                if not data.get('tasks') or len(data['tasks']) == 0:
-                    logger.warning("No tasks returned from DataForSEO")
-                    return []
+            task_result = data['tasks'][0]
 
-                task_result = data['tasks'][0]
+            if task_result.get('status_code') != 20000:
+                raise DataForSEOError(f"Task failed: {task_result.get('status_message')}")
 
-                if task_result.get('status_code') != 20000:
-                    logger.error(f"Task failed: {task_result.get('status_message')}")
-                    return []
+            # A successful live task doubles as a connectivity check
+            self._last_ok_ts = time.monotonic()
 
-                results = task_result.get('result', [])
-                if not results:
-                    logger.warning("No results in task response")
-                    return []
+            results = task_result.get('result', [])
+            if not results:
+                logger.warning("No results in task response")
+                return [], datetime.utcnow()
 
-                items = results[0].get('items', [])
+            items = results[0].get('items', [])
 
-                # Convert to our format
-                organic_results = []
-                for item in items:
-                    if item.get('type') == 'organic':
-                        result = OrganicResult(
-                            position=item.get('rank_group', item.get('rank_absolute')),
-                            title=item.get('title'),
-                            description=item.get('description'),
-                            url=item.get('url'),
-                            domain=item.get('domain'),
-                            breadcrumb=item.get('breadcrumb')
-                        )
-                        organic_results.append(result)
+            # Convert to our format, stopping at the requested depth so surplus items are never validated
+            organic_items = _project_items(items, ORGANIC_HANDLERS, request.depth)
 
-                logger.info(f"Found {len(organic_results)} organic results")
-                return organic_results[:request.depth]
+            # Validate the whole list in a single pydantic-core call
+            organic_results = OrganicResultsAdapter.validate_python(organic_items)
+
+            logger.debug("Found {} organic results", len(organic_results))
+            # Cache with the fetch time so cache hits report when the data was actually checked
+            fetched = (organic_results, datetime.utcnow())
+            if organic_results:
+                self._organic_cache.set(cache_key, fetched)
+            return fetched
 
         except Exception as e:
             logger.error(f"Error getting organic rankings: {e}")
-            return []
+            raise
+
+    async def get_maps_rankings(
+        self, request: RankingRequest, location: LocationData
+    ) -> Tuple[List[MapResult], datetime]:
+        """
+        Get Google Maps rankings and when they were fetched from DataForSEO
+
+        Raises DataForSEOError when the fetch fails.
+        """
+        cache_key = self._cache_key(request, location)
+        cached = self._maps_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-    async def get_maps_rankings(self, request: RankingRequest, location: LocationData) -> List[MapResult]:
-        """Get Google Maps rankings"""
         try:
             url = f"{self.base_url}/serp/google/maps/live/advanced"
 
@@ -146,67 +325,95 @@ class DataForSEOClient:
                 "depth": min(request.depth, 40)  # Maps API typically returns fewer results
             }
 
-            logger.info(f"Requesting maps rankings for: {request.keyword}")
+            logger.info("Requesting maps rankings for: {}", request.keyword)
+
+            response = await self._post_task(url, task)
+            if response.status_code != 200:
+                raise DataForSEOError(f"DataForSEO Maps API error: {response.status_code}")
 
-            async with self.session.post(url, json=[task]) as response:
-                if response.status != 200:
-                    logger.error(f"DataForSEO Maps API error: {response.status}")
-                    return []
+            data = orjson.loads(response.content)
 
-                data = await response.json()
+            if not data.get('tasks') or len(data['tasks']) == 0:
+                raise DataForSEOError("No maps tasks returned from DataForSEO")
 
-                if not data.get('tasks') or len(data['tasks']) == 0:
-                    logger.warning("No maps tasks returned from DataForSEO")
-                    return []
+            task_result = data['tasks'][0]
 
-                task_result = data['tasks'][0]
+            if task_result.get('status_code') != 20000:
+                raise DataForSEOError(f"Maps task failed: {task_result.get('status_message')}")
 
-                if task_result.get('status_code') != 20000:
-                    logger.error(f"Maps task failed: {task_result.get('status_message')}")
-                    return []
+            # A successful live task doubles as a connectivity check
+            self._last_ok_ts = time.monotonic()
 
-                results = task_result.get('result', [])
-                if not results:
-                    logger.warning("No maps results in task response")
-                    return []
+            results = task_result.get('result', [])
+            if not results:
+                logger.warning("No maps results in task response")
+                return [], datetime.utcnow()
 
-                items = results[0].get('items', [])
+            items = results[0].get('items', [])
 
-                # Convert to our format
-                map_results = []
-                for item in items:
-                    if item.get('type') == 'maps_paid' or item.get('type') == 'local_pack':
-                        result = MapResult(
-                            position=item.get('rank_group', item.get('rank_absolute')),
-                            title=item.get('title'),
-                            address=item.get('address'),
-                            phone=item.get('phone'),
-                            website=item.get('url'),
-                            rating=item.get('rating', {}).get('rating_value') if item.get('rating') else None,
-                            reviews_count=item.get('rating', {}).get('votes_count') if item.get('rating') else None,
-                            category=item.get('category')
-                        )
-                        map_results.append(result)
+            # Convert to our format, stopping at the requested depth so surplus items are never validated
+            map_items = _project_items(items, MAPS_HANDLERS, request.depth)
 
-                logger.info(f"Found {len(map_results)} maps results")
-                return map_results[:request.depth]
+            # Validate the whole list in a single pydantic-core call
+            map_results = MapResultsAdapter.validate_python(map_items)
+
+            logger.debug("Found {} maps results", len(map_results))
+            # Cache with the fetch time so cache hits report when the data was actually checked
+            fetched = (map_results, datetime.utcnow())
+            if map_results:
+                self._maps_cache.set(cache_key, fetched)
+            return fetched
 
         except Exception as e:
             logger.error(f"Error getting maps rankings: {e}")
-            return []
-
-    def _get_language_name(self, language_code: str) -> str:
-        """Convert language code to DataForSEO language name"""
-        language_map = {
-            'en': 'English',
-            'es': 'Spanish',
-            'fr': 'French',
-            'de': 'German',
-            'it': 'Italian',
-            'pt': 'Portuguese',
-            'ru': 'Russian',
-            'ja': 'Japanese',
-            'ko': 'Korean',
-            'zh': 'Chinese'
-        }
-        return language_map.get(language_code.lower(), 'English')
\ No newline at end of file
+            raise
+
+    async def get_all_rankings(self, request: RankingRequest, location: LocationData) -> Rankings:
+        """
+        Get organic and maps rankings concurrently
+
+        A failed fetch contributes no results and marks the rankings incomplete
+        instead of failing the other one.
+        """
+        (organic_results, organic_at, organic_ok), (maps_results, maps_at, maps_ok) = await asyncio.gather(
+            _results_or_empty(self.get_organic_rankings(request, location), "Organic"),
+            _results_or_empty(self.get_maps_rankings(request, location), "Maps")
+        )
+        return Rankings(organic_results, maps_results, min(organic_at, maps_at), organic_ok and maps_ok)
+
+    async def get_rankings_bulk(
+        self, requests: List[Tuple[RankingRequest, LocationData]]
+    ) -> List[Rankings]:
+        """
+        Get organic and maps rankings for many (request, location) pairs
+
+        Live SERP endpoints accept a single task per POST, so pairs are sent as
+        concurrent calls over the pooled connection, at most batch_size at a time.
+        """
+        semaphore = asyncio.Semaphore(settings.batch_size)
+
+        async def _get_rankings(request: RankingRequest, location: LocationData):
+            async with semaphore:
+                return await self.get_all_rankings(request, location)
+
+        return await asyncio.gather(*[_get_rankings(request, location) for request, location in requests])
+
+    def _cache_key(self, request: RankingRequest, location: LocationData) -> Tuple:
+        """Build the result cache key, rounding coordinates to ~11 m"""
+        return (
+            request.keyword.lower(),
+            round(location.latitude, 4),
+            round(location.longitude, 4),
+            request.device,
+            request.language_code,
+            request.depth
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _get_language_name(language_code: str) -> str:
+        """Convert language code to DataForSEO language name, memoized per code"""
+        language_name = LANGUAGE_NAMES.get(language_code)
+        if language_name is None:
+            language_name = LANGUAGE_NAMES.get(language_code.lower(), 'English')
+        return language_name
\ No newline at end of file
@@ -6,40 +6,64 @@ Test script for the Rank Tracker Prototype
 import asyncio
 import aiohttp
 import json
+import orjson
 from typing import Dict, Any
 
-async def test_api_endpoint(url: str, method: str = "GET", data: Dict[Any, Any] = None) -> Dict[str, Any]:
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+async def test_api_endpoint(session: aiohttp.ClientSession, url: str, method: str = "GET", data: Dict[Any, Any] = None) -> Dict[str, Any]:
     """Test an API endpoint"""
-    async with aiohttp.ClientSession() as session:
-        try:
-            if method.upper() == "POST":
-                async with session.post(url, json=data) as response:
-                    return {
-                        "status": response.status,
-                        "data": await response.json()
-                    }
-            else:
-                async with session.get(url) as response:
-                    return {
-                        "status": response.status,
-                        "data": await response.json()
-                    }
-        except Exception as e:
-            return {
-                "status": "error",
-                "error": str(e)
-            }
+    try:
+        if method.upper() == "POST":
+            async with session.post(url, data=orjson.dumps(data), headers=JSON_HEADERS) as response:
+                return {
+                    "status": response.status,
+                    "data": orjson.loads(await response.read())
+                }
+        else:
+            async with session.get(url) as response:
+                return {
+                    "status": response.status,
+                    "data": orjson.loads(await response.read())
+                }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e)
+        }
 
 async def run_tests():
-    """Run all tests"""
+    """Run all tests over a single shared HTTP session"""
+    async with aiohttp.ClientSession() as session:
+        await run_test_suite(session)
+
+async def run_test_suite(session: aiohttp.ClientSession):
+    """Run the API tests, independent checks concurrently"""
     base_url = "http://127.0.0.1:8000"
 
     print("🧪 Testing Rank Tracker Prototype API")
     print("=" * 50)
 
+    geocoding_data = {
+        "keyword": "test search",
+        "location": {
+            "address": "New York, NY",
+            "pincode": "10001"
+        },
+        "device": "desktop",
+        "language_code": "en",
+        "depth": 5
+    }
+
+    # Tests 1-3 are independent, so run them concurrently over the shared session
+    health_result, status_result, geocoding_result = await asyncio.gather(
+        test_api_endpoint(session, f"{base_url}/health"),
+        test_api_endpoint(session, f"{base_url}/api/status"),
+        test_api_endpoint(session, f"{base_url}/api/check-rankings", "POST", geocoding_data)
+    )
+
     # Test 1: Health check
     print("\n1. Testing health endpoint...")
-    health_result = await test_api_endpoint(f"{base_url}/health")
     print(f"   Status: {health_result['status']}")
     if health_result['status'] == 200:
         print("   ✅ Health check passed")
@@ -48,7 +72,6 @@ async def run_tests():
 
     # Test 2: API Status
     print("\n2. Testing API status endpoint...")
-    status_result = await test_api_endpoint(f"{base_url}/api/status")
     print(f"   Status: {status_result['status']}")
     if status_result['status'] == 200:
         print("   ✅ API status check passed")
@@ -60,22 +83,9 @@ async def run_tests():
 
     # Test 3: Geocoding Test
     print("\n3. Testing geocoding...")
-    geocoding_data = {
-        "keyword": "test search",
-        "location": {
-            "address": "New York, NY",
-            "pincode": "10001"
-        },
-        "device": "desktop",
-        "language_code": "en",
-        "depth": 5
-    }
-
     print("   Testing with sample data:")
     print(f"   - Keyword: {geocoding_data['keyword']}")
     print(f"   - Location: {geocoding_data['location']['address']}")
-
-    geocoding_result = await test_api_endpoint(f"{base_url}/api/check-rankings", "POST", geocoding_data)
     print(f"   Status: {geocoding_result['status']}")
 
     if geocoding_result['status'] == 200:
@@ -91,7 +101,7 @@ async def run_tests():
         elif 'data' in geocoding_result and 'detail' in geocoding_result['data']:
             print(f"   Error: {geocoding_result['data']['detail']}")
 
-    # Test 4: Sample Rank Check (if APIs are working)
+    # Test 4: Sample Rank Check (if APIs are working), after the status check it depends on
     if status_result['status'] == 200:
         print("\n4. Testing full ranking check...")
         ranking_data = {
@@ -110,7 +120,7 @@ async def run_tests():
         print(f"   - Location: {ranking_data['location']['address']}")
         print("   - This may take 10-30 seconds...")
 
-        ranking_result = await test_api_endpoint(f"{base_url}/api/check-rankings", "POST", ranking_data)
+        ranking_result = await test_api_endpoint(session, f"{base_url}/api/check-rankings", "POST", ranking_data)
         print(f"   Status: {ranking_result['status']}")
 
         if ranking_result['status'] == 200:
@@ -149,6 +159,13 @@ async def run_tests():
     print("   4. Check http://127.0.0.1:8000/docs for API documentation")
 
 if __name__ == "__main__":
+    # Use uvloop where available (not on Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
     try:
         asyncio.run(run_tests())
     except KeyboardInterrupt: